@@ -0,0 +1,74 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+class ContentRetriever:
+    def __init__(
+        self,
+        documents: Dict[str, str],
+        top_k: int = 6,
+        max_chars: int = 4000
+    ):
+        """
+        Inicializa o recuperador ajustando o TF-IDF sobre todos os parágrafos.
+
+        Args:
+            documents (Dict[str, str]): Conteúdo em markdown de cada documento
+            top_k (int): Número máximo de parágrafos retornados por consulta
+            max_chars (int): Tamanho máximo do contexto retornado
+        """
+        self.top_k = top_k
+        self.max_chars = max_chars
+        self.paragraphs: List[str] = [
+            para
+            for content in documents.values()
+            for para in content.split('\n\n')
+            if para.strip()
+        ]
+
+        # Ajusta o vetorizador uma única vez; o IDF reduz o peso de palavras comuns.
+        # Os parágrafos são convertidos para minúsculas aqui, uma única vez
+        self.vectorizer = TfidfVectorizer(lowercase=False)
+        self.matrix: Optional[Any] = None
+        try:
+            self.matrix = self.vectorizer.fit_transform([para.lower() for para in self.paragraphs])
+        except ValueError:
+            # Sem parágrafos ou sem palavras indexáveis (ex.: PDFs só com imagens):
+            # as consultas retornam contexto vazio em vez de impedir a inicialização
+            pass
+
+    def find_relevant_content(self, query: str) -> str:
+        """
+        Recupera os parágrafos mais relevantes para a consulta.
+
+        Args:
+            query (str): Pergunta do usuário
+
+        Returns:
+            str: Parágrafos relevantes concatenados, limitados a max_chars
+        """
+        if self.matrix is None:
+            return ""
+
+        # Normaliza a consulta uma única vez
+        return self._rank(self.vectorizer.transform([query.lower()]))
+
+    def _rank(self, query_vector) -> str:
+        """
+        Ordena os parágrafos pela similaridade com a consulta.
+
+        Args:
+            query_vector: Vetor TF-IDF da consulta
+
+        Returns:
+            str: Parágrafos relevantes concatenados, limitados a max_chars
+        """
+        scores = (self.matrix @ query_vector.T).toarray().ravel()
+
+        k = min(self.top_k, len(scores))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+
+        relevant_parts = [self.paragraphs[i] for i in top if scores[i] > 0]
+        context = "\n\n".join(relevant_parts)
+        return context[:self.max_chars]
@@ -1,17 +1,27 @@
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Deque, Dict, List, Optional, Any, Tuple
+from collections import deque
 from datetime import datetime
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from itertools import islice
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, SystemMessage
 
 class ContextManager:
+    # Limites do histórico mantido em memória
+    MAX_MESSAGES = 30  # 15 interações (pergunta + resposta)
+    EVICT_TURNS = 5  # Interações resumidas de uma só vez quando o limite é atingido
+    SUMMARY_HEADER = "[Resumo de interações anteriores]"
+    SUMMARY_MAX_LINES = 20
+    SUMMARY_LINE_CHARS = 120
+
     def __init__(self) -> None:
         """
         Inicializa o gerenciador de contexto com estruturas vazias.
         """
         self.context: Dict[str, Any] = {}
-        self.conversation_history: List[Dict[str, str]] = []
+        self.conversation_history: Deque[Dict[str, str]] = deque(maxlen=self.MAX_MESSAGES // 2)
+        self.archived_interactions: int = 0  # Interações descartadas de conversation_history
         self.empresa_info: Optional[Dict[str, Any]] = None
         self.last_update: datetime = datetime.utcnow()
-        self.messages: List[BaseMessage] = []  # Nova lista para mensagens do LangChain
+        self.messages: Deque[BaseMessage] = deque(maxlen=self.MAX_MESSAGES)  # Mensagens do LangChain
 
     def update_empresa_context(self, empresa_data: Dict[str, Any]) -> None:
         """
@@ -37,16 +47,17 @@ class ContextManager:
             # Atualiza empresa_info com cópia dos dados para evitar referências mutáveis
             self.empresa_info = empresa_data.copy()
             
-            # Atualiza o contexto com informações processadas
-            self.context.update({
-                'nome_empresa': empresa_data['nome_empresa'],
-                'setor': empresa_data['setor'],
-                'num_funcionarios': empresa_data['num_funcionarios'],
-                'possui_programa': empresa_data['possui_programa'],
-                'porte': self._categorize_company_size(empresa_data['num_funcionarios']),
-                'stage': 'experiente' if empresa_data['possui_programa'] else 'iniciante',
-                'last_update': datetime.utcnow().isoformat()
-            })
+            # Atualiza o contexto com informações processadas, sem dicionário intermediário
+            context = self.context
+            num_funcionarios = empresa_data['num_funcionarios']
+            possui_programa = empresa_data['possui_programa']
+            context['nome_empresa'] = empresa_data['nome_empresa']
+            context['setor'] = empresa_data['setor']
+            context['num_funcionarios'] = num_funcionarios
+            context['possui_programa'] = possui_programa
+            context['porte'] = self._categorize_company_size(num_funcionarios)
+            context['stage'] = 'experiente' if possui_programa else 'iniciante'
+            context['last_update'] = datetime.utcnow().isoformat()
 
             # Adiciona dados adicionais se existirem
             if 'dados_adicionais' in empresa_data:
@@ -87,6 +98,9 @@ class ContextManager:
         if not isinstance(question, str) or not isinstance(answer, str):
             raise ValueError("Pergunta e resposta devem ser strings")
 
+        # Resume as interações mais antigas antes que o deque descarte mensagens
+        self._evict()
+
         # Adiciona à lista de mensagens do LangChain
         self.messages.append(HumanMessage(content=question.strip()))
         self.messages.append(AIMessage(content=answer.strip()))
@@ -98,9 +112,39 @@ class ContextManager:
             'timestamp': datetime.utcnow().isoformat()
         }
         
+        if len(self.conversation_history) == self.conversation_history.maxlen:
+            self.archived_interactions += 1
         self.conversation_history.append(entry)
         self.last_update = datetime.utcnow()
 
+    def _evict(self) -> None:
+        """
+        Resume as interações mais antigas em uma única SystemMessage quando
+        não há espaço para uma nova interação.
+
+        O resumo ocupa sempre a primeira posição e só muda a cada EVICT_TURNS
+        interações, mantendo estável o início do prompt.
+        """
+        if len(self.messages) + 2 <= self.MAX_MESSAGES:
+            return
+
+        summary_lines = []
+        if isinstance(self.messages[0], SystemMessage):
+            summary_lines.extend(self.messages.popleft().content.splitlines()[1:])
+
+        for _ in range(self.EVICT_TURNS * 2):
+            if not self.messages:
+                break
+            msg = self.messages.popleft()
+            prefix = "Usuário" if isinstance(msg, HumanMessage) else "Assistente"
+            content = " ".join(msg.content.split())
+            if len(content) > self.SUMMARY_LINE_CHARS:
+                content = content[:self.SUMMARY_LINE_CHARS].rstrip() + "..."
+            summary_lines.append(f"{prefix}: {content}")
+
+        summary_lines = summary_lines[-self.SUMMARY_MAX_LINES:]
+        self.messages.appendleft(SystemMessage(content="\n".join([self.SUMMARY_HEADER, *summary_lines])))
+
     def get_messages(self) -> List[BaseMessage]:
         """
         Retorna as mensagens no formato do LangChain.
@@ -108,7 +152,7 @@ class ContextManager:
         Returns:
             List[BaseMessage]: Lista de mensagens do LangChain
         """
-        return self.messages
+        return list(self.messages)
 
     def get_recent_history(self, limit: int = 5) -> Tuple[List[Dict[str, str]], List[BaseMessage]]:
         """
@@ -126,8 +170,9 @@ class ContextManager:
             raise ValueError("Limite deve ser um número inteiro positivo")
             
         return (
-            self.conversation_history[-limit:],
-            self.messages[-(limit*2):]  # *2 porque cada interação tem 2 mensagens
+            list(islice(self.conversation_history, max(len(self.conversation_history) - limit, 0), None)),
+            # *2 porque cada interação tem 2 mensagens
+            list(islice(self.messages, max(len(self.messages) - limit * 2, 0), None))
         )
 
     def get_context_summary(self) -> Dict[str, Any]:
@@ -148,7 +193,7 @@ class ContextManager:
 
         return {
             'empresa_info': self.empresa_info,
-            'num_interactions': len(self.conversation_history),
+            'num_interactions': self.archived_interactions + len(self.conversation_history),
             'last_interaction': self.conversation_history[-1] if self.conversation_history else None,
             'context_age': int((datetime.utcnow() - self.last_update).total_seconds() // 60),  # em minutos
             'porte': self.context.get('porte'),
@@ -159,25 +204,30 @@ class ContextManager:
         """
         Limpa o histórico de conversação mantendo as informações da empresa.
         """
-        self.conversation_history = []
-        self.messages = []  # Limpa também as mensagens do LangChain
+        self.conversation_history.clear()
+        self.archived_interactions = 0
+        self.messages.clear()  # Limpa também as mensagens do LangChain
         self.last_update = datetime.utcnow()
 
     def export_context(self) -> Dict[str, Any]:
         """
         Exporta todo o contexto e histórico para formato serializável.
 
+        Os dicionários são retornados por referência; apenas o histórico é
+        copiado (cópia rasa), pois o deque não é serializável e continua
+        sendo alterado a cada nova interação.
+
         Returns:
             Dict[str, Any]: Dados completos do contexto e histórico
         """
         return {
             'context': self.context,
             'empresa_info': self.empresa_info,
-            'conversation_history': self.conversation_history,
+            'conversation_history': list(self.conversation_history),
             'last_update': self.last_update.isoformat(),
             'metadata': {
                 'export_time': datetime.utcnow().isoformat(),
-                'num_interactions': len(self.conversation_history),
+                'num_interactions': self.archived_interactions + len(self.conversation_history),
                 'context_version': '1.1'
             }
         }
\ No newline at end of file
@@ -1,17 +1,90 @@
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, Optional, Set
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 import re
 
+try:
+    import hyperscan
+except ImportError:  # Dependência opcional; sem ela os padrões rodam com o módulo re
+    hyperscan = None
+
 class ConversationProcessor:
+    # Palavras-chave comuns em perguntas sobre aprendizagem
+    KEYWORDS = [
+        'aprendiz', 'contrato', 'idade', 'salário', 'curso',
+        'escola', 'horário', 'férias', 'direitos', 'deveres',
+        'cota', 'contratação', 'rescisão', 'benefícios'
+    ]
+
+    QUESTION_PATTERNS = {
+        'multi_part': r'\?.*\?',  # Detecta múltiplas perguntas
+        'numerical': r'\d+',       # Detecta números
+        'comparison': r'diferença|versus|comparação|entre',  # Detecta comparações
+        'requirement': r'preciso|necessário|obrigatório',    # Detecta requisitos
+        'legal': r'lei|artigo|legislação|clt',  # Detecta referências legais
+        'doubt': r'como|qual|quando|onde|por que|porque|quem|quanto',  # Perguntas comuns
+    }
+
     def __init__(self):
+        # Padrões compilados uma única vez para evitar recompilação a cada pergunta
         self.question_patterns = {
-            'multi_part': r'\?.*\?',  # Detecta múltiplas perguntas
-            'numerical': r'\d+',       # Detecta números
-            'comparison': r'diferença|versus|comparação|entre',  # Detecta comparações
-            'requirement': r'preciso|necessário|obrigatório',    # Detecta requisitos
-            'legal': r'lei|artigo|legislação|clt',  # Detecta referências legais
-            'doubt': r'como|qual|quando|onde|por que|porque|quem|quanto',  # Perguntas comuns
+            k: re.compile(p, re.IGNORECASE) for k, p in self.QUESTION_PATTERNS.items()
         }
+        self._pattern_names = list(self.QUESTION_PATTERNS)
+        self._hs_db = self._build_hyperscan_db()
+        self._keyword_re = re.compile(r'\b(' + '|'.join(self.KEYWORDS) + r')\b', re.IGNORECASE)
+        # Separa por "?" ou por "e"/"ou" seguidos de uma nova pergunta, em uma única passada
+        self._split_re = re.compile(
+            r'\?|\s+(?:e|ou)\s+(?=como|qual|quando|onde|por que|porque|quem|quanto)',
+            re.IGNORECASE
+        )
+
+    def _build_hyperscan_db(self) -> Optional[Any]:
+        """
+        Compila todos os padrões de pergunta em um único banco do hyperscan.
+
+        Returns:
+            Optional[Any]: Banco compilado ou None se o hyperscan não estiver disponível
+        """
+        if hyperscan is None:
+            return None
+
+        flags = (
+            hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_UTF8
+            | hyperscan.HS_FLAG_UCP | hyperscan.HS_FLAG_SINGLEMATCH
+        )
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[self.QUESTION_PATTERNS[name].encode('utf-8') for name in self._pattern_names],
+                ids=list(range(len(self._pattern_names))),
+                elements=len(self._pattern_names),
+                flags=[flags] * len(self._pattern_names)
+            )
+            return db
+        except hyperscan.error:
+            return None
+
+    def _match_patterns(self, question: str) -> Set[str]:
+        """
+        Identifica quais padrões de pergunta aparecem no texto.
+
+        Args:
+            question (str): A pergunta do usuário
+
+        Returns:
+            Set[str]: Nomes dos padrões encontrados
+        """
+        if self._hs_db is None:
+            return {name for name, pattern in self.question_patterns.items() if pattern.search(question)}
+
+        # Uma única varredura do texto avalia todos os padrões
+        matched = set()
+
+        def on_match(pattern_id, start, end, flags, context):
+            matched.add(self._pattern_names[pattern_id])
+
+        self._hs_db.scan(question.encode('utf-8'), match_event_handler=on_match)
+        return matched
 
     def process_question(self, question: str) -> Dict[str, Any]:
         """
@@ -23,15 +96,17 @@ class ConversationProcessor:
         Returns:
             Dict[str, Any]: Análise detalhada da pergunta
         """
+        matched = self._match_patterns(question)
+        sub_questions = self._split_questions(question)
         parts = {
-            'has_multiple_questions': bool(re.search(self.question_patterns['multi_part'], question)),
-            'contains_numbers': bool(re.search(self.question_patterns['numerical'], question)),
-            'is_comparison': bool(re.search(self.question_patterns['comparison'], question)),
-            'is_requirement': bool(re.search(self.question_patterns['requirement'], question)),
-            'has_legal_reference': bool(re.search(self.question_patterns['legal'], question, re.IGNORECASE)),
-            'is_question': bool(re.search(self.question_patterns['doubt'], question, re.IGNORECASE)),
-            'sub_questions': self._split_questions(question),
-            'complexity': self._evaluate_complexity(question),
+            'has_multiple_questions': 'multi_part' in matched,
+            'contains_numbers': 'numerical' in matched,
+            'is_comparison': 'comparison' in matched,
+            'is_requirement': 'requirement' in matched,
+            'has_legal_reference': 'legal' in matched,
+            'is_question': 'doubt' in matched,
+            'sub_questions': sub_questions,
+            'complexity': self._evaluate_complexity(question, matched, sub_questions),
             'keywords': self._extract_keywords(question)
         }
         return parts
@@ -46,35 +121,43 @@ class ConversationProcessor:
         Returns:
             List[str]: Lista de perguntas individuais
         """
-        # Primeiro, trata casos especiais com "e" ou "ou"
-        text = re.sub(r'\s+e\s+(?=como|qual|quando|onde|por que|porque|quem|quanto)', '? ', text, flags=re.IGNORECASE)
-        text = re.sub(r'\s+ou\s+(?=como|qual|quando|onde|por que|porque|quem|quanto)', '? ', text, flags=re.IGNORECASE)
-        
-        # Depois divide por "?"
-        return [q.strip() + '?' for q in text.split('?') if q.strip()]
-
-    def _evaluate_complexity(self, question: str) -> str:
+        parts = (q.strip() for q in self._split_re.split(text))
+        return [q + '?' for q in parts if q]
+
+    def _evaluate_complexity(
+        self,
+        question: str,
+        matched: Optional[Set[str]] = None,
+        sub_questions: Optional[List[str]] = None
+    ) -> str:
         """
         Avalia a complexidade da pergunta.
 
         Args:
             question (str): A pergunta a ser avaliada
+            matched (Optional[Set[str]]): Padrões já identificados na pergunta
+            sub_questions (Optional[List[str]]): Perguntas já separadas por _split_questions
 
         Returns:
             str: Nível de complexidade ('simples', 'média' ou 'complexa')
         """
+        if matched is None:
+            matched = self._match_patterns(question)
+        if sub_questions is None:
+            sub_questions = self._split_questions(question)
+
         score = 0
         
         # Critérios de complexidade
-        if self.question_patterns['has_multiple_questions']:
+        if 'multi_part' in matched:
             score += 2
-        if self.question_patterns['is_comparison']:
+        if 'comparison' in matched:
             score += 2
         if len(question.split()) > 20:
             score += 1
-        if self.question_patterns['legal']:
+        if 'legal' in matched:
             score += 1
-        if len(self._split_questions(question)) > 1:
+        if len(sub_questions) > 1:
             score += 2
 
         if score <= 2:
@@ -93,19 +176,9 @@ class ConversationProcessor:
         Returns:
             List[str]: Lista de palavras-chave encontradas
         """
-        # Palavras-chave comuns em perguntas sobre aprendizagem
-        keywords = [
-            'aprendiz', 'contrato', 'idade', 'salário', 'curso',
-            'escola', 'horário', 'férias', 'direitos', 'deveres',
-            'cota', 'contratação', 'rescisão', 'benefícios'
-        ]
-        
-        found_keywords = []
-        for keyword in keywords:
-            if re.search(r'\b' + keyword + r'\b', text, re.IGNORECASE):
-                found_keywords.append(keyword)
-                
-        return found_keywords
+        # Uma única varredura do texto; mantém a ordem da lista de palavras-chave
+        found = set(self._keyword_re.findall(text.lower()))
+        return [keyword for keyword in self.KEYWORDS if keyword in found]
 
     def process_messages(self, messages: List[BaseMessage]) -> List[Dict[str, Any]]:
         """
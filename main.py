@@ -3,13 +3,13 @@ from openai import OpenAI
 import os
 from dotenv import load_dotenv
 from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.datamodel.base_models import InputFormat
+from docling.datamodel.base_models import InputFormat, ConversionStatus
 from docling.datamodel.pipeline_options import PdfPipelineOptions
 from pathlib import Path
 import pickle
-import hashlib
 import logging
 from datetime import datetime
+from content_retriever import ContentRetriever
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +18,16 @@ logger = logging.getLogger(__name__)
 # Carrega variáveis de ambiente
 load_dotenv()
 
+# Instruções fixas do assistente; o contexto dos documentos vai em uma mensagem
+# separada para que este prefixo seja idêntico em todas as requisições
+SYSTEM_PROMPT = """Você é um assistente especializado da Eureca, focado em:
+1. Lei de Aprendizagem
+2. Boas práticas na seleção de jovens aprendizes
+3. Informações sobre a Eureca
+
+Use APENAS as informações do contexto fornecido para responder às perguntas.
+Se a informação não estiver no contexto, diga que não tem essa informação específica."""
+
 # Configuração da página
 try:
     st.set_page_config(
@@ -30,20 +40,41 @@ except Exception as e:
     st.error("Erro na inicialização da página")
 
 def get_file_hash(file_path: str) -> str:
-    """Calcula o hash do arquivo para verificar mudanças"""
+    """Gera uma impressão digital (tamanho:mtime) do arquivo para verificar mudanças sem ler seu conteúdo"""
     try:
-        with open(file_path, 'rb') as f:
-            return hashlib.md5(f.read()).hexdigest()
+        stat = os.stat(file_path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
     except Exception as e:
         logger.error(f"Erro ao calcular hash do arquivo {file_path}: {e}")
         return None
 
+def load_markdown_cache(cache_path: str) -> dict:
+    """Lê do disco o markdown já convertido de cada documento, no formato {nome: (hash, markdown)}"""
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Cache de documentos inválido, ignorando: {e}")
+        return {}
+
+def save_markdown_cache(cache_path: str, cache: dict) -> None:
+    """Grava em disco o markdown convertido de cada documento"""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump(cache, f)
+    except Exception as e:
+        logger.error(f"Erro ao salvar cache de documentos: {e}")
+
 @st.cache_resource(show_spinner=True)
 def load_pdf_contents():
     logger.info("Iniciando carregamento dos PDFs")
     
     # Obtem o diretório atual do script
     current_dir = os.path.dirname(os.path.abspath(__file__))
+    cache_path = os.path.join(current_dir, ".cache", "documents.pkl")
     
     pdf_paths = {
         "manual": os.path.join(current_dir, "Manual_lei_de_aprendizagem.pdf"),
@@ -58,6 +89,20 @@ def load_pdf_contents():
             st.error(f"Arquivo {name} não encontrado em: {path}")
             return None
 
+    # Reaproveita conversões anteriores cujos arquivos não mudaram
+    cache = load_markdown_cache(cache_path)
+    file_hashes = {name: get_file_hash(path) for name, path in pdf_paths.items()}
+    documents = {
+        name: cache[name][1]
+        for name in pdf_paths
+        if file_hashes[name] is not None and cache.get(name, (None,))[0] == file_hashes[name]
+    }
+    pending = {name: path for name, path in pdf_paths.items() if name not in documents}
+    
+    if not pending:
+        logger.info("Documentos carregados do cache")
+        return documents
+
     try:
         # Configuração do DocumentConverter
         pipeline_options = PdfPipelineOptions(
@@ -78,20 +123,26 @@ def load_pdf_contents():
         progress_text = "Carregando documentos..."
         my_bar = st.progress(0, text=progress_text)
         
-        documents = {}
-        total_files = len(pdf_paths)
+        total_files = len(pending)
+        names_by_file = {Path(path).name: name for name, path in pending.items()}
+        
+        # Converte todos os PDFs pendentes em lote, inicializando o pipeline uma só vez.
+        # As conversões ficam na thread principal: o pypdfium2 usado pelo docling não é thread-safe
+        results = doc_converter.convert_all(list(pending.values()), raises_on_error=False)
         
-        for idx, (name, path) in enumerate(pdf_paths.items(), 1):
+        for idx, conv_result in enumerate(results, 1):
+            name = names_by_file.get(conv_result.input.file.name, conv_result.input.file.name)
             try:
-                logger.info(f"Processando documento: {name}")
                 # Atualiza barra de progresso
                 progress = idx/total_files
                 my_bar.progress(progress, text=f"Processando {name}... {int(progress*100)}%")
                 
-                # Converte PDF
-                conv_result = doc_converter.convert(path)
+                if conv_result.status != ConversionStatus.SUCCESS:
+                    raise RuntimeError(f"conversão terminou com status {conv_result.status}")
+                
                 markdown_content = conv_result.document.export_to_markdown()
                 documents[name] = markdown_content
+                cache[name] = (file_hashes[name], markdown_content)
                 
                 logger.info(f"Documento {name} processado com sucesso")
                 
@@ -100,7 +151,10 @@ def load_pdf_contents():
                 st.error(f"Erro ao processar {name}: {str(e)}")
                 continue
         
+        # Mantém a ordem original dos documentos, incluindo os que vieram do cache
+        documents = {name: documents[name] for name in pdf_paths if name in documents}
         my_bar.empty()
+        save_markdown_cache(cache_path, cache)
         return documents if documents else None
         
     except Exception as e:
@@ -108,25 +162,19 @@ def load_pdf_contents():
         st.error(f"Erro no carregamento dos documentos: {str(e)}")
         return None
 
-def find_relevant_content(query: str, documents: dict) -> str:
+@st.cache_resource(show_spinner=False)
+def build_retriever(_documents: dict) -> ContentRetriever:
+    """Ajusta o índice TF-IDF uma única vez por processo"""
+    return ContentRetriever(_documents)
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def cached_relevant_content(query: str, _retriever: ContentRetriever) -> str:
+    """Guarda o contexto por pergunta entre reruns e sessões; o recuperador é fixo no processo"""
+    return _retriever.find_relevant_content(query)
+
+def find_relevant_content(query: str, retriever: ContentRetriever) -> str:
     try:
-        relevant_parts = []
-        query_words = set(query.lower().split())
-        
-        for doc_name, content in documents.items():
-            paragraphs = content.split('\n\n')
-            scored_paragraphs = []
-            
-            for para in paragraphs:
-                score = sum(para.lower().count(word) for word in query_words)
-                if score > 0:
-                    scored_paragraphs.append((score, para))
-            
-            scored_paragraphs.sort(reverse=True)
-            relevant_parts.extend([p for _, p in scored_paragraphs[:2]])
-        
-        context = "\n\n".join(relevant_parts)
-        return context[:4000]
+        return cached_relevant_content(query, retriever)
     except Exception as e:
         logger.error(f"Erro ao encontrar conteúdo relevante: {e}")
         return ""
@@ -148,6 +196,8 @@ try:
         st.error("Não foi possível carregar os documentos. Verifique os arquivos e tente novamente.")
         st.stop()
 
+    retriever = build_retriever(documents)
+
 except Exception as e:
     logger.error(f"Erro durante o carregamento: {e}")
     st.error("Erro durante o carregamento dos documentos")
@@ -190,27 +240,17 @@ if prompt := st.chat_input("Faça sua pergunta..."):
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    relevant_context = find_relevant_content(prompt, documents)
+    relevant_context = find_relevant_content(prompt, retriever)
     
     with st.chat_message("assistant"):
         try:
             response = client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
-                    {
-                        "role": "system", 
-                        "content": f"""Você é um assistente especializado da Eureca, focado em:
-                        1. Lei de Aprendizagem
-                        2. Boas práticas na seleção de jovens aprendizes
-                        3. Informações sobre a Eureca
-                        
-                        Use APENAS as informações do contexto fornecido para responder às perguntas.
-                        Se a informação não estiver no contexto, diga que não tem essa informação específica.
-                        
-                        Contexto relevante dos documentos:
-                        {relevant_context}"""
-                    },
-                    *st.session_state.messages
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    *st.session_state.messages[:-1],
+                    {"role": "user", "content": f"Contexto relevante dos documentos:\n{relevant_context}"},
+                    st.session_state.messages[-1]
                 ],
                 stream=True,
                 temperature=0.7
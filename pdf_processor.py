@@ -3,11 +3,55 @@ import streamlit as st
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 import os
 from datetime import datetime, timedelta
+from functools import lru_cache
 import hashlib
+import mmap
+
+@st.cache_resource(show_spinner=False)
+def _load_embeddings(model_name: str, batch_size: int) -> HuggingFaceEmbeddings:
+    """
+    Carrega o modelo local de embeddings uma única vez por processo.
+
+    Args:
+        model_name (str): Nome do modelo sentence-transformers
+        batch_size (int): Número de textos codificados por lote
+
+    Returns:
+        HuggingFaceEmbeddings: Modelo de embeddings carregado
+    """
+    return HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={'batch_size': batch_size})
+
+@lru_cache(maxsize=64)
+def _hash_file(file_path: str, mtime_ns: int, size: int) -> str:
+    """
+    Calcula o hash MD5 do conteúdo de um arquivo.
+
+    mtime_ns e size fazem parte da chave do cache: um os.stat basta para
+    saber se o arquivo precisa ser lido novamente.
+
+    Args:
+        file_path (str): Caminho do arquivo
+        mtime_ns (int): Data de modificação do arquivo em nanossegundos
+        size (int): Tamanho do arquivo em bytes
+
+    Returns:
+        str: Hash MD5 do arquivo
+    """
+    with open(file_path, "rb") as f:
+        # file_digest (Python 3.11+) lê e calcula o hash inteiramente em C
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "md5").hexdigest()
+
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.md5().hexdigest()
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.md5(mm).hexdigest()
 
 class PDFProcessor:
     def __init__(self):
@@ -21,8 +65,9 @@ class PDFProcessor:
             'sobre_eureca': os.path.join(current_dir, "Sobre_Eureca.pdf")
         }
         self.vectorstore: Optional[FAISS] = None
+        self._per_file_stores: Dict[str, Optional[FAISS]] = {}  # Índice de cada arquivo (None se não tem texto)
         self.last_processed: Optional[datetime] = None
-        self.file_hashes: Dict[str, str] = {}
+        self.file_hashes: Dict[str, str] = {}  # Impressão digital (tamanho:mtime) de cada arquivo
         
         # Configurações do processamento
         self.chunk_settings = {
@@ -30,13 +75,21 @@ class PDFProcessor:
             'chunk_overlap': 200,
             'length_function': len
         }
+
+        # Modelo multilíngue local: sem custo por token nem chamadas de rede
+        self.embedding_model = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+        self.embedding_batch_size = 64
         
         # Tempo máximo de cache (12 horas)
         self.cache_duration = timedelta(hours=12)
 
+        # Diretório dos índices FAISS persistidos entre execuções
+        self.cache_dir = os.path.join(current_dir, ".cache")
+
     def _calculate_file_hash(self, file_path: str) -> str:
         """
-        Calcula o hash MD5 de um arquivo.
+        Calcula o hash MD5 de um arquivo, reaproveitando o resultado enquanto
+        o tamanho e a data de modificação não mudarem.
 
         Args:
             file_path (str): Caminho do arquivo
@@ -44,16 +97,43 @@ class PDFProcessor:
         Returns:
             str: Hash MD5 do arquivo
         """
-        hash_md5 = hashlib.md5()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+        stat = os.stat(file_path)
+        return _hash_file(file_path, stat.st_mtime_ns, stat.st_size)
 
-    def _should_reprocess(self) -> bool:
+    def _get_file_fingerprint(self, file_path: str) -> str:
+        """
+        Gera uma impressão digital barata do arquivo a partir do tamanho e da
+        data de modificação, sem ler seu conteúdo.
+
+        Args:
+            file_path (str): Caminho do arquivo
+
+        Returns:
+            str: Impressão digital no formato "tamanho:mtime_ns"
+        """
+        stat = os.stat(file_path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _get_current_fingerprints(self) -> Dict[str, str]:
+        """
+        Calcula a impressão digital de cada PDF existente.
+
+        Returns:
+            Dict[str, str]: Impressão digital de cada arquivo, indexada pelo caminho
+        """
+        return {
+            file_path: self._get_file_fingerprint(file_path)
+            for file_path in self.pdf_files.values()
+            if os.path.exists(file_path)
+        }
+
+    def _should_reprocess(self, current_fingerprints: Optional[Dict[str, str]] = None) -> bool:
         """
         Verifica se os PDFs precisam ser reprocessados.
 
+        Args:
+            current_fingerprints (Optional[Dict[str, str]]): Impressões digitais já calculadas
+
         Returns:
             bool: True se precisar reprocessar
         """
@@ -64,24 +144,27 @@ class PDFProcessor:
         if datetime.utcnow() - self.last_processed > self.cache_duration:
             return True
 
+        if current_fingerprints is None:
+            current_fingerprints = self._get_current_fingerprints()
+
         # Verifica mudanças nos arquivos
         for file_path in self.pdf_files.values():
-            if not os.path.exists(file_path):
+            if file_path not in current_fingerprints:
                 return True
             
-            current_hash = self._calculate_file_hash(file_path)
-            if file_path not in self.file_hashes or self.file_hashes[file_path] != current_hash:
+            if self.file_hashes.get(file_path) != current_fingerprints[file_path]:
                 return True
 
         return False
 
-    def _process_single_pdf(self, file_path: str, file_type: str) -> List[Document]:
+    def _process_single_pdf(self, file_path: str, file_type: str, file_hash: str) -> List[Document]:
         """
         Processa um único arquivo PDF.
 
         Args:
             file_path (str): Caminho do arquivo
             file_type (str): Tipo do arquivo (manual, boas_praticas, etc.)
+            file_hash (str): Hash do arquivo já calculado
 
         Returns:
             List[Document]: Lista de documentos processados
@@ -94,11 +177,60 @@ class PDFProcessor:
                 'source_type': file_type,
                 'filename': file_path,
                 'processed_at': datetime.utcnow().isoformat(),
-                'file_hash': self._calculate_file_hash(file_path)
+                'file_hash': file_hash
             })
             
         return documents
 
+    def _get_index_path(self, file_hash: str) -> str:
+        """
+        Monta o caminho do índice FAISS persistido de um arquivo.
+
+        Args:
+            file_hash (str): Hash do conteúdo do arquivo
+
+        Returns:
+            str: Diretório do índice, identificado pelo conteúdo, pelas
+                configurações de divisão e pelo modelo de embeddings
+        """
+        settings = (
+            f"{file_hash}:{self.chunk_settings['chunk_size']}:"
+            f"{self.chunk_settings['chunk_overlap']}:{self.embedding_model}"
+        )
+        fingerprint = hashlib.md5(settings.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"faiss_{fingerprint}")
+
+    def _merge_stores(self, embeddings: Embeddings) -> FAISS:
+        """
+        Combina os índices de cada arquivo em um único vectorstore, sem
+        recalcular embeddings. Arquivos sem texto extraído não têm índice e
+        são ignorados.
+
+        Args:
+            embeddings (Embeddings): Modelo de embeddings dos índices
+
+        Returns:
+            FAISS: Vectorstore com os chunks de todos os arquivos
+        """
+        stores = [
+            self._per_file_stores[file_type]
+            for file_type in self.pdf_files
+            if self._per_file_stores[file_type] is not None
+        ]
+        if not stores:
+            raise ValueError("Nenhum texto foi extraído dos PDFs")
+
+        # Copia o primeiro índice para que merge_from não altere os índices por arquivo
+        merged = FAISS.deserialize_from_bytes(
+            stores[0].serialize_to_bytes(),
+            embeddings,
+            allow_dangerous_deserialization=True
+        )
+        for store in stores[1:]:
+            merged.merge_from(store)
+
+        return merged
+
     def process_pdf(self) -> bool:
         """
         Processa todos os PDFs e cria/atualiza o vectorstore.
@@ -107,8 +239,11 @@ class PDFProcessor:
             bool: True se o processamento foi bem sucedido
         """
         try:
+            # Verifica mudanças apenas pelos metadados dos arquivos
+            current_fingerprints = self._get_current_fingerprints()
+
             # Verifica se pode usar cache
-            if not self._should_reprocess() and 'vectorstore' in st.session_state:
+            if not self._should_reprocess(current_fingerprints) and 'vectorstore' in st.session_state:
                 self.vectorstore = st.session_state.vectorstore
                 return True
 
@@ -124,29 +259,83 @@ class PDFProcessor:
                 st.error(f"Arquivos não encontrados: {', '.join(missing_files)}")
                 return False
 
-            # Processa todos os documentos
-            all_documents = []
-            self.file_hashes = {}
+            # Com o cache expirado todos os arquivos são reprocessados
+            if not self.last_processed or datetime.utcnow() - self.last_processed > self.cache_duration:
+                self._per_file_stores = {}
+                self.file_hashes = {}
+
+            # Apenas arquivos novos ou alterados geram novos embeddings
+            changed_files = {
+                file_type: file_path
+                for file_type, file_path in self.pdf_files.items()
+                if file_type not in self._per_file_stores
+                or self.file_hashes.get(file_path) != current_fingerprints[file_path]
+            }
+
+            text_splitter = RecursiveCharacterTextSplitter(
+                **self.chunk_settings
+            )
+            embeddings = _load_embeddings(self.embedding_model, self.embedding_batch_size)
+            
+            # Reaproveita índices salvos em disco por execuções anteriores
+            files_to_embed = {}
+            for file_type, file_path in changed_files.items():
+                # O hash do conteúdo só é calculado quando há reprocessamento
+                file_hash = self._calculate_file_hash(file_path)
+                index_path = self._get_index_path(file_hash)
+                
+                if os.path.isdir(index_path):
+                    try:
+                        self._per_file_stores[file_type] = FAISS.load_local(
+                            index_path, embeddings, allow_dangerous_deserialization=True
+                        )
+                        self.file_hashes[file_path] = current_fingerprints[file_path]
+                        continue
+                    except Exception:
+                        pass  # Índice corrompido: recria abaixo
+                
+                files_to_embed[file_type] = (file_path, file_hash, index_path)
             
-            for file_type, file_path in self.pdf_files.items():
+            # Carrega e divide os documentos de cada arquivo alterado
+            file_splits = {}
+            for file_type, (file_path, file_hash, _) in files_to_embed.items():
                 try:
-                    documents = self._process_single_pdf(file_path, file_type)
-                    all_documents.extend(documents)
-                    self.file_hashes[file_path] = self._calculate_file_hash(file_path)
+                    documents = self._process_single_pdf(file_path, file_type, file_hash)
+                    file_splits[file_type] = text_splitter.split_documents(documents)
                     
                 except Exception as e:
                     st.error(f"Erro ao processar {file_path}: {str(e)}")
                     return False
 
-            # Divide os documentos
-            text_splitter = RecursiveCharacterTextSplitter(
-                **self.chunk_settings
-            )
-            splits = text_splitter.split_documents(all_documents)
+            # Calcula os embeddings de todos os arquivos alterados em uma única chamada em lote
+            texts = [doc.page_content for splits in file_splits.values() for doc in splits]
+            vectors = embeddings.embed_documents(texts) if texts else []
+
+            # Cria e salva o índice de cada arquivo a partir dos vetores já calculados
+            offset = 0
+            for file_type, splits in file_splits.items():
+                file_path, _, index_path = files_to_embed[file_type]
+                file_texts = texts[offset:offset + len(splits)]
+                file_vectors = vectors[offset:offset + len(splits)]
+                offset += len(splits)
+
+                # PDFs escaneados ou só com imagens não geram chunks; o FAISS não
+                # cria índice vazio, então o arquivo apenas não entra na combinação
+                if not splits:
+                    st.warning(f"Nenhum texto extraído de {file_path}")
+                    self._per_file_stores[file_type] = None
+                    self.file_hashes[file_path] = current_fingerprints[file_path]
+                    continue
+                
+                self._per_file_stores[file_type] = FAISS.from_embeddings(
+                    list(zip(file_texts, file_vectors)),
+                    embeddings,
+                    metadatas=[doc.metadata for doc in splits]
+                )
+                self._per_file_stores[file_type].save_local(index_path)
+                self.file_hashes[file_path] = current_fingerprints[file_path]
 
-            # Cria embeddings e vectorstore
-            embeddings = OpenAIEmbeddings()
-            self.vectorstore = FAISS.from_documents(splits, embeddings)
+            self.vectorstore = self._merge_stores(embeddings)
             
             # Atualiza cache
             st.session_state.vectorstore = self.vectorstore
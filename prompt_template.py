@@ -1,18 +1,128 @@
-from string import Template
-from typing import Dict, List, Any, Union
+import re
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, List, Any, NamedTuple, Optional, Sequence, Tuple, Union
+import tiktoken
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
 
+# Saudações reconhecidas. "olá" também é aceito na forma decomposta (a + acento
+# combinante U+0301), enviada por alguns teclados, sem normalizar uma cópia do texto
+_GREETINGS: frozenset = frozenset({
+    'oi', 'olá', 'ola', 'ola\u0301', 'hi', 'hello', 'ei',
+    'bom dia', 'boa tarde', 'boa noite', 'hey'
+})
+
+# Saudações isoladas, com pontuação ou espaços opcionais nas extremidades;
+# as alternativas mais longas vêm primeiro
+_GREETING_RE = re.compile(
+    r'[\s!.,]*(?:%s)[\s!.,]*' % '|'.join(map(re.escape, sorted(_GREETINGS, key=lambda g: (-len(g), g)))),
+    re.IGNORECASE
+)
+
+class Context(NamedTuple):
+    """Dados da empresa usados para montar os prompts, lidos por posição em vez de chave."""
+    nome_empresa: Optional[str] = None
+    setor: Optional[str] = None
+    possui_programa: Any = 'Não informado'
+
+def _as_context(context: Union[Context, Dict[str, Any]]) -> Context:
+    """Converte o contexto em Context uma única vez por chamada; um Context é usado como está."""
+    if isinstance(context, Context):
+        return context
+    get = context.get
+    return Context(get('nome_empresa'), get('setor'), get('possui_programa', 'Não informado'))
+
+def _tail(history: Sequence[Any], n: int) -> Sequence[Any]:
+    """Retorna os últimos n itens do histórico; em deques percorre apenas esses n itens."""
+    if isinstance(history, deque):
+        if len(history) <= n:
+            return history
+        return list(islice(reversed(history), n))[::-1]
+    return history[-n:]
+
+# Prefixo de cada tipo de mensagem no histórico formatado
+_PREFIX = {HumanMessage: "Usuário: ", AIMessage: "Assistente: ", SystemMessage: "Sistema: "}
+
+# Saudação usada quando faltam dados da empresa; a mensagem é criada uma única vez
+_FALLBACK_GREETING = """Olá! Que bom ter você aqui! Sou o assistente da Eureca e estou aqui para ajudar com tudo relacionado à Lei de Aprendizagem. Como posso ajudar hoje?"""
+_FALLBACK_SYSMSG = SystemMessage(content=_FALLBACK_GREETING)
+
+# As mensagens do LangChain não são alteradas depois de criadas, então a mesma
+# instância pode ser reaproveitada por todas as interações de uma empresa
+@lru_cache(maxsize=1)
+def _static_system_msg() -> SystemMessage:
+    """
+    Prompt principal, idêntico para todas as empresas. Por ser o primeiro
+    trecho de toda requisição, a OpenAI o reaproveita automaticamente pelo
+    cache de prefixo.
+    """
+    return SystemMessage(content=PromptTemplate.MAIN_SYSTEM_PROMPT)
+
+@lru_cache(maxsize=512)
+def _empresa_msg(nome_empresa: str, setor: str) -> SystemMessage:
+    """Renderiza e valida os dados da empresa uma única vez por (empresa, setor)."""
+    return SystemMessage(content=PromptTemplate.EMPRESA_TEMPLATE % {
+        'nome_empresa': nome_empresa,
+        'setor': setor
+    })
+
+@lru_cache(maxsize=1)
+def _encoding() -> tiktoken.Encoding:
+    """Carrega o tokenizador apenas na primeira vez em que é necessário."""
+    return tiktoken.get_encoding("cl100k_base")
+
+@lru_cache(maxsize=128)
+def _tokenized_system(nome_empresa: str, setor: str) -> Tuple[int, ...]:
+    """Tokeniza as mensagens de sistema uma única vez por (empresa, setor)."""
+    content = "\n\n".join((_static_system_msg().content, _empresa_msg(nome_empresa, setor).content))
+    return tuple(_encoding().encode(content))
+
+# Situação do programa de aprendizagem, indexada por (possui_programa == "Sim")
+_STATUS = (
+    "ainda não possuem um programa de aprendizagem",
+    "já possuem um programa de aprendizagem"
+)
+
+def _format_greeting(nome_empresa: str, setor: str, possui_programa: Any, status_programa: str) -> str:
+    """Monta as instruções específicas para saudações."""
+    return f"""Você é o assistente virtual da Eureca. 
+    
+CONTEXTO ESPECÍFICO:
+Empresa: {nome_empresa}
+Setor: {setor}
+Status: {possui_programa}
+
+INSTRUÇÕES EXATAS:
+Responda EXATAMENTE neste formato:
+"Olá! Que bom ter você aqui! Sou o assistente da Eureca e estou aqui para ajudar a {nome_empresa} com tudo relacionado à Lei de Aprendizagem. Vi que vocês são do setor de {setor} e {status_programa}. Como posso ajudar hoje?"
+
+REGRAS CRÍTICAS:
+- Use EXATAMENTE o formato acima
+- NÃO adicione NADA além do texto especificado
+- NÃO mencione leis ou artigos
+- NÃO sugira próximos passos
+- NÃO inclua informações adicionais"""
+
+@lru_cache(maxsize=512)
+def _greeting_msg(nome_empresa: str, setor: str, possui_programa: Any) -> SystemMessage:
+    """Renderiza e valida a saudação uma única vez por (empresa, setor, programa)."""
+    return SystemMessage(content=_format_greeting(
+        nome_empresa, setor, possui_programa, _STATUS[possui_programa == "Sim"]
+    ))
+
 class PromptTemplate:
-    # Template principal com regras mais específicas
-    MAIN_SYSTEM_PROMPT = Template("""Você é o assistente virtual da Eureca, especialista em Jovem Aprendiz.
+    # Prompt principal com regras mais específicas; não tem variáveis para que
+    # seja um prefixo idêntico (e cacheável) em todas as requisições
+    MAIN_SYSTEM_PROMPT = """Você é o assistente virtual da Eureca, especialista em Jovem Aprendiz.
 
 REGRAS OBRIGATÓRIAS (SEMPRE SIGA ESTAS REGRAS):
 1. NUNCA mencione leis, artigos ou base legal, a menos que EXPLICITAMENTE solicitado
 2. NUNCA liste "próximos passos" ou qualquer tipo de lista numerada
 3. NUNCA use formatos automáticos como "1.", "2.", etc.
 4. NUNCA adicione informações não solicitadas
-5. SEMPRE use o nome real da empresa: ${nome_empresa}
-6. SEMPRE use o setor real da empresa: ${setor}
+5. SEMPRE use o nome real da empresa informado em DADOS DA EMPRESA
+6. SEMPRE use o setor real da empresa informado em DADOS DA EMPRESA
 7. SEMPRE mantenha um tom amigável e consultivo
 8. SEMPRE personalize as respostas para o contexto da empresa
 
@@ -34,35 +144,18 @@ O QUE EVITAR:
 - NÃO use "Próximos passos:" ou similar
 - NÃO cite artigos da CLT sem solicitação
 - NÃO faça listas numeradas
-- NÃO use linguagem muito formal""")
-
-    # Template específico para saudações melhorado
-    GREETING_TEMPLATE = Template("""Você é o assistente virtual da Eureca. 
-    
-CONTEXTO ESPECÍFICO:
-Empresa: ${nome_empresa}
-Setor: ${setor}
-Status: ${possui_programa}
-
-INSTRUÇÕES EXATAS:
-Responda EXATAMENTE neste formato:
-"Olá! Que bom ter você aqui! Sou o assistente da Eureca e estou aqui para ajudar a ${nome_empresa} com tudo relacionado à Lei de Aprendizagem. Vi que vocês são do setor de ${setor} e ${status_programa}. Como posso ajudar hoje?"
+- NÃO use linguagem muito formal"""
 
-REGRAS CRÍTICAS:
-- Use EXATAMENTE o formato acima
-- NÃO adicione NADA além do texto especificado
-- NÃO mencione leis ou artigos
-- NÃO sugira próximos passos
-- NÃO inclua informações adicionais""")
+    # Dados da empresa, enviados logo após o prompt principal
+    EMPRESA_TEMPLATE = """DADOS DA EMPRESA:
+Empresa: %(nome_empresa)s
+Setor: %(setor)s"""
 
     @staticmethod
     def is_greeting(text: str) -> bool:
         """Verifica se o texto é uma saudação."""
-        saudacoes = {
-            'oi', 'olá', 'ola', 'hi', 'hello', 'ei', 
-            'bom dia', 'boa tarde', 'boa noite', 'hey'
-        }
-        return text.lower().strip('!., ') in saudacoes
+        # Saudação exata (caso mais comum) dispensa a expressão regular
+        return text in _GREETINGS or _GREETING_RE.fullmatch(text) is not None
 
     @staticmethod
     def format_chat_history(messages: List[BaseMessage]) -> str:
@@ -75,108 +168,185 @@ REGRAS CRÍTICAS:
         Returns:
             str: Histórico formatado
         """
-        formatted_history = []
-        
-        for msg in messages:
-            prefix = "Usuário: " if isinstance(msg, HumanMessage) else "Assistente: "
-            formatted_history.append(f"{prefix}{msg.content}")
-            
-        return "\n".join(formatted_history)
+        return "\n".join(f"{_PREFIX.get(type(msg), 'Assistente: ')}{msg.content}" for msg in messages)
 
     @staticmethod
-    def generate_greeting(context: Dict[str, Any]) -> Union[str, List[BaseMessage]]:
+    def generate_greeting(context: Union[Context, Dict[str, Any]]) -> Union[str, List[BaseMessage]]:
         """
         Gera uma saudação inicial personalizada.
 
         Args:
-            context (Dict[str, Any]): Contexto atual
+            context (Union[Context, Dict[str, Any]]): Contexto atual
 
         Returns:
             Union[str, List[BaseMessage]]: Mensagens para o LangChain ou string do template
         """
-        possui_programa = context.get('possui_programa') == "Sim"
-        status_programa = (
-            "já possuem um programa de aprendizagem" 
-            if possui_programa 
-            else "ainda não possuem um programa de aprendizagem"
-        )
-
-        # Garante que temos valores válidos
-        nome_empresa = context.get('nome_empresa')
-        setor = context.get('setor')
+        nome_empresa, setor, possui_programa = _as_context(context)
         
+        # Garante que temos valores válidos
         if not nome_empresa or not setor:
             # Fallback seguro se faltar informação
-            greeting = """Olá! Que bom ter você aqui! Sou o assistente da Eureca e estou aqui para ajudar com tudo relacionado à Lei de Aprendizagem. Como posso ajudar hoje?"""
-            return [SystemMessage(content=greeting)]
-
-        # Cria o dicionário com todas as variáveis necessárias
-        template_vars = {
-            'nome_empresa': nome_empresa,
-            'setor': setor,
-            'possui_programa': context.get('possui_programa', 'Não informado'),
-            'status_programa': status_programa
-        }
-
-        try:
-            greeting = PromptTemplate.GREETING_TEMPLATE.substitute(template_vars)
-            return [SystemMessage(content=greeting)]
-        except KeyError as e:
-            # Fallback seguro em caso de erro
-            greeting = f"""Olá! Que bom ter você aqui! Sou o assistente da Eureca e estou aqui para ajudar a {nome_empresa} com tudo relacionado à Lei de Aprendizagem. Como posso ajudar hoje?"""
-            return [SystemMessage(content=greeting)]
+            return [_FALLBACK_SYSMSG]
+
+        return [_greeting_msg(nome_empresa, setor, possui_programa)]
 
     @staticmethod
     def generate_prompt(
-        context: Dict[str, Any], 
+        context: Union[Context, Dict[str, Any]], 
         question: str, 
-        chat_history: Union[List[Dict[str, str]], List[BaseMessage]]
-    ) -> Union[str, List[BaseMessage]]:
+        chat_history: Union[List[Dict[str, str]], List[BaseMessage]],
+        use_dict_messages: bool = False
+    ) -> Union[str, List[BaseMessage], List[Dict[str, str]]]:
         """
         Gera prompt personalizado para a interação.
 
         Args:
-            context (Dict[str, Any]): Contexto atual
+            context (Union[Context, Dict[str, Any]]): Contexto atual; um Context
+                evita as consultas ao dicionário
             question (str): Pergunta do usuário
-            chat_history: Histórico de chat (formato antigo ou LangChain)
+            chat_history: Histórico de chat (formato antigo ou LangChain). Pode ser
+                uma lista ou, de preferência, um deque(maxlen=6) mantido pelo
+                chamador, evitando copiar o histórico inteiro a cada interação
+            use_dict_messages (bool): Se True, retorna mensagens no formato
+                {"role": ..., "content": ...}, aceito diretamente por ChatOpenAI
+                e pela API da OpenAI, sem criar objetos de mensagem do LangChain
 
         Returns:
-            Union[str, List[BaseMessage]]: Prompt personalizado
+            Union[str, List[BaseMessage], List[Dict[str, str]]]: Prompt personalizado
         """
+        # Converte o contexto uma única vez para os dois caminhos
+        context = _as_context(context)
+
         # Verifica se é uma saudação
         if PromptTemplate.is_greeting(question):
-            return PromptTemplate.generate_greeting(context)
-
-        # Formata o histórico baseado no tipo
-        if isinstance(chat_history[0], BaseMessage) if chat_history else False:
-            chat_history_text = PromptTemplate.format_chat_history(chat_history[-6:])  # últimas 3 interações
-        else:
-            chat_history_text = "\n".join([
-                f"Usuário: {h['question']}\nAssistente: {h['answer']}" 
-                for h in chat_history[-3:]
-            ]) if chat_history else ""
+            greeting = PromptTemplate.generate_greeting(context)
+            if use_dict_messages:
+                return [{"role": "system", "content": msg.content} for msg in greeting]
+            return greeting
 
-        # Garante que temos valores válidos
-        nome_empresa = context.get('nome_empresa', 'Empresa')
-        setor = context.get('setor', 'não especificado')
+        chat_history_text = PromptTemplate._format_history(chat_history)
 
-        try:
-            # Cria o prompt do sistema usando o Template
-            system_prompt = PromptTemplate.MAIN_SYSTEM_PROMPT.substitute({
-                'nome_empresa': nome_empresa,
-                'setor': setor
-            })
+        # Conteúdo estático primeiro; histórico e pergunta, que mudam a cada
+        # interação, ficam juntos na última mensagem
+        if chat_history_text:
+            question = f"Histórico recente:\n{chat_history_text}\n\nPergunta: {question}"
 
-            # Retorna lista de mensagens para o LangChain
+        if use_dict_messages:
+            # As mensagens de sistema já estão em cache; só a pergunta é nova
             return [
-                SystemMessage(content=system_prompt),
-                *([SystemMessage(content=f"\nCONTEXTO ATUAL:\n{chat_history_text}")] if chat_history_text else []),
-                HumanMessage(content=question)
+                *({"role": "system", "content": msg.content} for msg in PromptTemplate._build_system(context)),
+                {"role": "user", "content": question}
             ]
-        except KeyError as e:
-            # Fallback seguro em caso de erro
-            system_prompt = """Você é o assistente virtual da Eureca, especialista em Jovem Aprendiz."""
-            return [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=question)
-            ]
\ No newline at end of file
+
+        # Retorna lista de mensagens para o LangChain; _build_system devolve uma
+        # lista nova a cada chamada, então pode ser estendida diretamente
+        messages = PromptTemplate._build_system(context)
+        messages.append(HumanMessage(content=question))
+        return messages
+
+    @staticmethod
+    def generate_batch_prompt(
+        context: Union[Context, Dict[str, Any]],
+        questions: List[str],
+        chat_history: Union[List[Dict[str, str]], List[BaseMessage], None] = None
+    ) -> List[BaseMessage]:
+        """
+        Gera um único prompt para várias perguntas independentes, enviando o
+        prompt do sistema uma só vez para todo o lote.
+
+        As perguntas são numeradas como [Q1], [Q2], ... e o modelo é instruído a
+        iniciar cada resposta com o marcador [A1], [A2], ... correspondente, o
+        que permite ao chamador separar as respostas.
+
+        Args:
+            context (Union[Context, Dict[str, Any]]): Contexto atual
+            questions (List[str]): Perguntas a serem respondidas
+            chat_history: Histórico de chat (formato antigo ou LangChain)
+
+        Returns:
+            List[BaseMessage]: Mensagens para o LangChain
+        """
+        chat_history_text = PromptTemplate._format_history(chat_history)
+        numbered_questions = "\n".join(f"[Q{i}] {q}" for i, q in enumerate(questions, 1))
+        content = (
+            "Responda separadamente a cada pergunta abaixo. Inicie cada resposta "
+            "com o marcador [A<n>] da pergunta [Q<n>] correspondente.\n\n"
+            f"{numbered_questions}"
+        )
+
+        # O histórico vai na própria mensagem do usuário, como em generate_prompt,
+        # evitando uma mensagem de sistema extra a cada lote
+        if chat_history_text:
+            content = f"Histórico recente:\n{chat_history_text}\n\n{content}"
+
+        messages = PromptTemplate._build_system(context)
+        messages.append(HumanMessage(content=content))
+        return messages
+
+    @staticmethod
+    def get_system_tokens(context: Union[Context, Dict[str, Any]]) -> Tuple[int, ...]:
+        """
+        Retorna os tokens (cl100k_base) das mensagens de sistema da empresa,
+        útil para estimar o orçamento de tokens antes de montar o prompt.
+
+        Args:
+            context (Union[Context, Dict[str, Any]]): Contexto atual
+
+        Returns:
+            Tuple[int, ...]: Tokens do prompt principal seguido dos dados da empresa
+        """
+        ctx = _as_context(context)
+        return _tokenized_system(ctx.nome_empresa or 'Empresa', ctx.setor or 'não especificado')
+
+    @classmethod
+    def warm_cache(cls, contexts: Iterable[Union[Context, Dict[str, Any]]]) -> None:
+        """
+        Pré-constrói as mensagens em cache das empresas conhecidas. Deve ser
+        chamado na inicialização da aplicação, para que a primeira interação de
+        cada empresa não pague o custo de montar e validar as mensagens.
+
+        Args:
+            contexts (Iterable[Union[Context, Dict[str, Any]]]): Contextos das empresas
+        """
+        for context in contexts:
+            ctx = _as_context(context)
+            cls._build_system(ctx)
+            cls.generate_greeting(ctx)
+
+    @staticmethod
+    def _build_system(context: Union[Context, Dict[str, Any]]) -> List[SystemMessage]:
+        """
+        Retorna as mensagens de sistema: o prompt principal, estático e
+        cacheável, seguido dos dados da empresa do contexto. O conteúdo dinâmico
+        (histórico e pergunta) vem sempre depois, preservando o prefixo.
+
+        Args:
+            context (Union[Context, Dict[str, Any]]): Contexto atual
+
+        Returns:
+            List[SystemMessage]: Mensagens de sistema (instâncias compartilhadas)
+        """
+        # Garante que temos valores válidos
+        ctx = _as_context(context)
+        return [_static_system_msg(), _empresa_msg(ctx.nome_empresa or 'Empresa', ctx.setor or 'não especificado')]
+
+    @staticmethod
+    def _format_history(chat_history: Union[List[Dict[str, str]], List[BaseMessage], None]) -> str:
+        """
+        Formata as últimas interações do histórico, em qualquer dos formatos.
+
+        Args:
+            chat_history: Histórico de chat (formato antigo ou LangChain)
+
+        Returns:
+            str: Histórico formatado ou string vazia
+        """
+        # Formata o histórico baseado no tipo
+        if not chat_history:
+            return ""
+        if type(chat_history[0]) is dict:
+            return "\n".join(
+                f"Usuário: {h['question']}\nAssistente: {h['answer']}" 
+                for h in _tail(chat_history, 3)
+            )
+        return PromptTemplate.format_chat_history(_tail(chat_history, 6))  # últimas 3 interações